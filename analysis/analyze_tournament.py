@@ -1,21 +1,63 @@
 # --- START OF FILE analysis/analyze_tournament.py ---
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 import os
 import argparse
 import sys
 import re
 import json
+import io
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pandas.api.types import CategoricalDtype
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    def njit(*args, **kwargs):
+        """Fallback when numba is not installed: run the decorated function as plain Python/NumPy."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
 
 # --- Configuration ---
 BASE_OUTPUT_DIR = "analysis_outputs"
+# Figures reused across openings within a process (see _reusable_axes)
+_FIGURES = {}
+# Heatmaps with more strategies than this skip per-cell annotations (S^2 text artists)
+MAX_ANNOTATED_STRATEGIES = 20
+HEATMAP_DPI = 150
+# Tournament CSV schema: parsed straight into these dtypes, other columns are not read
+CSV_DTYPES = {
+    'Strategy': 'category', 'Opponent': 'category', 'Opening': 'category',
+    'Wins': 'Int64', 'Losses': 'Int64', 'Draws': 'Int64', 'Games Played': 'Int64',
+    'Win %': 'float64', # Only read for the legacy filter dropping rows with a missing Win % (see read_tournament_csv)
+}
+# Rows per chunk when streaming the CSV; memory is bounded by the chunk plus the aggregated matchups
+CSV_CHUNKSIZE = 1_000_000
+MATCHUP_KEYS = ['Strategy', 'Opponent', 'Opening']
+COUNT_COLUMNS = ['Wins', 'Losses', 'Draws', 'Games Played']
 
 # --- Helper Function ---
-def create_output_directory(csv_filepath):
-    """Creates a unique output directory based on the CSV filename."""
+# Plotting stack is imported on first use (see _load_plotting), so --no-plots runs never pay for it
+plt = None
+sns = None
+
+def _load_plotting():
+    """Imports matplotlib (Agg backend, also in worker processes) and seaborn into the module globals."""
+    global plt, sns
+    if plt is None:
+        import matplotlib
+        matplotlib.use('Agg') # Non-interactive backend; figures are only saved to disk
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+def create_output_directory(csv_filepath, no_plots=False):
+    """Creates a unique output directory based on the CSV filename (without the figure folders if no_plots)."""
     try:
         base_filename = os.path.basename(csv_filepath)
         run_identifier, _ = os.path.splitext(base_filename)
@@ -23,8 +65,9 @@ def create_output_directory(csv_filepath):
         heatmaps_dir = os.path.join(run_output_dir, "Heat Maps")
         dynamics_dir = os.path.join(run_output_dir, "Replicator Dynamics")
         equilibria_dir = os.path.join(run_output_dir, "Nash Equilibria")
-        os.makedirs(heatmaps_dir, exist_ok=True)
-        os.makedirs(dynamics_dir, exist_ok=True)
+        if not no_plots:
+            os.makedirs(heatmaps_dir, exist_ok=True)
+            os.makedirs(dynamics_dir, exist_ok=True)
         os.makedirs(equilibria_dir, exist_ok=True)
         print(f"Output will be saved in: {run_output_dir}")
         return run_output_dir, heatmaps_dir, dynamics_dir, equilibria_dir
@@ -32,23 +75,271 @@ def create_output_directory(csv_filepath):
         print(f"Error creating output directory: {e}")
         sys.exit(1)
 
+def read_tournament_csv(csv_file, chunksize=CSV_CHUNKSIZE):
+    """
+    Streams the CSV in chunks, summing the counts per (Strategy, Opponent, Opening).
+    Win % is recomputed from the summed Wins / (Wins + Losses). Strategy and Opponent
+    share one ordered categorical dtype whose categories are the sorted strategy names;
+    openings keep their order of first appearance in the file.
+    """
+    cols_to_numeric = ['Wins', 'Losses', 'Draws', 'Win %', 'Games Played']
+    totals = None
+    opening_order = []
+    for chunk in pd.read_csv(csv_file, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunksize):
+        # Drop rows with missing essential numeric data. The CSV's Win % is otherwise unused (it is
+        # recomputed from the summed counts below) but kept here so the same rows are dropped as before
+        chunk = chunk.dropna(subset=cols_to_numeric)
+        opening_order.extend(o for o in chunk['Opening'].unique() if o not in opening_order)
+        chunk_totals = chunk.groupby(MATCHUP_KEYS, observed=True)[COUNT_COLUMNS].sum()
+        totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+
+    df = totals.reset_index() if totals is not None else pd.DataFrame(columns=MATCHUP_KEYS + COUNT_COLUMNS)
+    decisive_games = df['Wins'] + df['Losses']
+    df['Win %'] = (df['Wins'] / decisive_games.where(decisive_games > 0) * 100).fillna(0.0).astype(float)
+    # Chunks carry their own categories, so re-categorize on the combined frame. Downstream
+    # groupbys/pivots then work on integer codes; they pass observed=True to skip unseen combinations.
+    # Opponents that never appear as 'Strategy' become NaN; they fall outside every matchup matrix anyway.
+    strategy_dtype = CategoricalDtype(np.sort(np.asarray(df['Strategy'].unique())), ordered=True)
+    for col in ('Strategy', 'Opponent'):
+        df[col] = df[col].astype(strategy_dtype)
+    df['Opening'] = df['Opening'].astype(CategoricalDtype(opening_order, ordered=True))
+    return df.sort_values('Opening', kind='stable', ignore_index=True)
+
+# --- Replicator Dynamics ---
+@njit(cache=True, fastmath=True)
+def _replicator_rhs(A, x):
+    """dx/dt = x * (f - x.f) where f = A x is the fitness of each strategy."""
+    f = A @ x
+    return x * (f - x @ f)
+
+@njit(cache=True, fastmath=True)
+def replicator_dynamics(A, y0, timepoints):
+    """
+    Integrates the replicator equation with fixed-step RK4 (one step per timepoint).
+    Returns a (len(timepoints), len(y0)) array of population shares.
+    """
+    populations = np.empty((timepoints.size, y0.size))
+    x = y0.copy()
+    populations[0] = x
+    for t in range(1, timepoints.size):
+        dt = timepoints[t] - timepoints[t - 1]
+        k1 = _replicator_rhs(A, x)
+        k2 = _replicator_rhs(A, x + 0.5 * dt * k1)
+        k3 = _replicator_rhs(A, x + 0.5 * dt * k2)
+        k4 = _replicator_rhs(A, x + dt * k3)
+        x = x + dt / 6.0 * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+        populations[t] = x
+    return populations
+
+# --- Zero-Sum Equilibria ---
+def solve_zero_sum_game(payoff_matrix_A):
+    """
+    Minimax strategies of the zero-sum game A via two linear programs (HiGHS).
+    Row: max v s.t. A.T x >= v, sum(x) = 1, x >= 0. Column: min u s.t. A y <= u, sum(y) = 1, y >= 0.
+    Returns (row_strategy, column_strategy) as numpy arrays, clipped to >= 0 and renormalised to sum to 1.
+    """
+    from scipy.optimize import linprog
+
+    n_rows, n_cols = payoff_matrix_A.shape
+    row_lp = linprog(c=[0.0] * n_rows + [-1.0],
+                     A_ub=np.hstack([-payoff_matrix_A.T, np.ones((n_cols, 1))]), b_ub=np.zeros(n_cols),
+                     A_eq=[[1.0] * n_rows + [0.0]], b_eq=[1.0],
+                     bounds=[(0, None)] * n_rows + [(None, None)], method='highs')
+    col_lp = linprog(c=[0.0] * n_cols + [1.0],
+                     A_ub=np.hstack([payoff_matrix_A, -np.ones((n_rows, 1))]), b_ub=np.zeros(n_rows),
+                     A_eq=[[1.0] * n_cols + [0.0]], b_eq=[1.0],
+                     bounds=[(0, None)] * n_cols + [(None, None)], method='highs')
+    if not (row_lp.success and col_lp.success):
+        raise ValueError(f"Linear program failed: {row_lp.message if not row_lp.success else col_lp.message}")
+    # HiGHS can leave round-off in the solution (tiny negatives, sums like 1.0000000000000002)
+    row_strategy, col_strategy = np.clip(row_lp.x[:n_rows], 0, None), np.clip(col_lp.x[:n_cols], 0, None)
+    return row_strategy / row_strategy.sum(), col_strategy / col_strategy.sum()
+
+# --- Matchup Matrix ---
+@njit(cache=True)
+def _accumulate_matchups(n_strategies, strategy_codes, opponent_codes, values):
+    """Sums values into an (S, S) matrix at [strategy_code, opponent_code]."""
+    totals = np.zeros((n_strategies, n_strategies), np.float64)
+    # Serial on purpose: a parallel prange scatter-add would race on repeated cells
+    for k in range(strategy_codes.size):
+        totals[strategy_codes[k], opponent_codes[k]] += values[k]
+    return totals
+
+def build_matchup_matrix_pct(opening_df, strategies):
+    """
+    Head-to-head Win % (Wins / (Wins + Losses)) of row strategy vs column opponent,
+    NaN where a matchup has no data. Uses the numba kernel when available, else a pivot.
+    """
+    if not HAS_NUMBA:
+        matchup_pivot = opening_df.pivot_table(index='Strategy', columns='Opponent', values='Win %', aggfunc='first', observed=True)
+        return matchup_pivot.reindex(index=strategies, columns=strategies).to_numpy(dtype=float, copy=True)
+
+    # strategies are the categories of the shared Strategy/Opponent dtype, so codes index them directly
+    strategy_codes = opening_df['Strategy'].cat.codes.to_numpy()
+    opponent_codes = opening_df['Opponent'].cat.codes.to_numpy()
+    known = (strategy_codes >= 0) & (opponent_codes >= 0)
+    strategy_codes, opponent_codes = strategy_codes[known].astype(np.int64), opponent_codes[known].astype(np.int64)
+    n = len(strategies)
+    wins = _accumulate_matchups(n, strategy_codes, opponent_codes, opening_df['Wins'].to_numpy(dtype=np.float64)[known])
+    losses = _accumulate_matchups(n, strategy_codes, opponent_codes, opening_df['Losses'].to_numpy(dtype=np.float64)[known])
+    present = _accumulate_matchups(n, strategy_codes, opponent_codes, np.ones(strategy_codes.size))
+    decisive_games = wins + losses
+    win_pct = np.divide(wins, decisive_games, out=np.zeros_like(wins), where=decisive_games > 0) * 100
+    win_pct[present == 0] = np.nan
+    return win_pct
+
+# --- Per Opening Analysis ---
+def _reusable_axes(name, figsize):
+    """
+    Returns (fig, ax) for a per-process figure that is created once and cleared on
+    reuse, so figure construction is amortized across openings. Worker figures are
+    released when the pool shuts down.
+    """
+    fig = _FIGURES.get(name)
+    if fig is None:
+        fig = plt.figure(figsize=figsize)
+        _FIGURES[name] = fig
+    else:
+        fig.clear() # Also drops the previous heatmap's colorbar axes
+        fig.set_size_inches(figsize)
+    return fig, fig.add_subplot()
+
+def analyze_opening(k, opening, opening_df, strategies, heatmaps_dir, dynamics_dir, has_nashpy, no_plots=False):
+    """
+    Matchup heatmap, replicator dynamics and Nash equilibria for a single opening.
+    With no_plots, only the equilibria are computed.
+    Returns (opening, equilibria list or error dict, or None if Nashpy is unavailable).
+    """
+    opening_result = None
+    if not no_plots:
+        _load_plotting()
+    annot = len(strategies) <= MAX_ANNOTATED_STRATEGIES
+    if has_nashpy:
+        import nashpy as nash
+
+    print(f"\n--- Analyzing Opening: {opening} ---")
+
+    # --- 1. Matchup Heatmap (Head-to-Head Win %) ---
+    # Writable ndarray of Win % (Wins / (Wins + Losses)); the pivot fallback copies so the diagonal can be written
+    matchup_values = build_matchup_matrix_pct(opening_df, strategies)
+    np.fill_diagonal(matchup_values, 50.0)
+    matchup_matrix_pct = pd.DataFrame(matchup_values, index=strategies, columns=strategies)
+    missing_matchups = matchup_matrix_pct.isna().stack()
+    for s1, s2 in missing_matchups[missing_matchups].index.tolist():
+        print(f"Warning: Missing matchup data for {s1} vs {s2} in {opening}")
+
+    if not no_plots:
+        print(f"Generating Matchup Heatmap for {opening}...")
+        fig_hm, ax_hm = _reusable_axes('matchup_heatmap', (max(10, len(strategies)*0.8), max(8, len(strategies)*0.7)))
+        sns.heatmap(matchup_matrix_pct, ax=ax_hm, annot=annot, fmt=".1f", cmap="viridis_r", rasterized=True,
+                   linewidths=.5, linecolor='lightgray', cbar_kws={'label': f'Win % for Row Player'})
+        ax_hm.set_xlabel('Opponent Strategy'); ax_hm.set_ylabel('Strategy'); ax_hm.set_title(f'Head-to-Head Win % ({opening})')
+        plt.setp(ax_hm.get_xticklabels(), rotation=45, ha='right'); plt.setp(ax_hm.get_yticklabels(), rotation=0); fig_hm.tight_layout()
+        heatmap_filename = f'{k+1}_{opening.replace(" ", "_")}_Matchup_Heatmap.png'
+        save_path = os.path.join(heatmaps_dir, heatmap_filename); fig_hm.savefig(save_path, dpi=HEATMAP_DPI)
+        print(f"Saved: {save_path}")
+
+    # --- 2. Replicator Dynamics & Nash Equilibria ---
+    if has_nashpy:
+        print(f"Calculating {'' if no_plots else 'Replicator Dynamics and '}Nash Equilibria for {opening}...")
+         # Payoff matrix A based on head-to-head win rate (row player's perspective)
+        payoff_matrix_A = np.ascontiguousarray(matchup_matrix_pct.to_numpy(dtype=np.float64)) / 100.0
+
+        if np.isnan(payoff_matrix_A).any():
+            print(f"Skipping Nashpy analysis for {opening} due to missing data (NaN).")
+            return opening, {"error": "Skipped due to NaN in payoff matrix"}
+
+        try:
+            # --- 2a. Replicator Dynamics ---
+            # ... (Replicator dynamics plotting code remains the same) ...
+            if not no_plots:
+                initial_pop = np.array([1/len(strategies)] * len(strategies))
+                # 2000 points is ample resolution for the line plot; the ODE cost scales with the step count
+                timepoints = np.linspace(0, 50, 2000)
+                populations = replicator_dynamics(payoff_matrix_A, initial_pop, timepoints)
+                generations = np.arange(len(populations))
+                palette = sns.color_palette("husl", len(strategies))
+                # Scoped style: a global set_style would leak into whichever heatmaps this worker draws next
+                with sns.axes_style("whitegrid"):
+                    fig_rd, ax_rd = _reusable_axes('replicator_dynamics', (12, 8))
+                    for i, strategy in enumerate(strategies):
+                        ax_rd.plot(generations, populations[:, i], label=strategy, color=palette[i], linewidth=2.5)
+                ax_rd.set_title(f'Replicator Dynamics ({opening})', fontsize=16)
+                ax_rd.set_xlabel('Generation', fontsize=14); ax_rd.set_ylabel('Population Share', fontsize=14); ax_rd.set_ylim(0, 1.05)
+                ax_rd.legend(title='Strategy', bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.)
+                ax_rd.grid(True, linestyle='--', alpha=0.7); fig_rd.tight_layout(rect=[0, 0, 0.85, 1])
+                rd_filename = f"{k+1}_{opening.replace(' ', '_')}_RD.png"
+                save_path = os.path.join(dynamics_dir, rd_filename); fig_rd.savefig(save_path, dpi=300)
+                print(f"Saved: {save_path}")
+
+
+            # --- 2b. Nash Equilibria (Minimax LP; Vertex Enumeration fallback) ---
+            # nash.Game(A) is zero-sum by construction (B = -A), so the minimax LP is exact for any A here.
+            # For finite A it is always feasible and bounded; the fallback only covers a solver failure.
+            ne_method = "linear programming"
+            print(f"Finding Nash Equilibria for {opening} using {ne_method.title()}...")
+            opening_nes_list = []
+            try:
+                try:
+                    equilibria = [solve_zero_sum_game(payoff_matrix_A)]
+                except ValueError as lp_error:
+                    ne_method = "vertex enumeration"
+                    print(f"{lp_error} for {opening}; falling back to {ne_method}.")
+                    equilibria = list(nash.Game(payoff_matrix_A).vertex_enumeration())
+                print(f"Nash Equilibria found for {opening}:")
+                ne_count = 0
+                for i, eq in enumerate(equilibria):
+                    ne_count += 1
+                    print(f"  NE {i+1}:")
+                    row_ne_probs, col_ne_probs = eq[0], eq[1]
+                    # .tolist() yields native floats, so the dicts are JSON-serializable as-is
+                    row_mask, col_mask = row_ne_probs > 1e-4, col_ne_probs > 1e-4
+                    row_ne_dict = dict(zip([strategies[idx] for idx in np.nonzero(row_mask)[0]], row_ne_probs[row_mask].tolist()))
+                    col_ne_dict = dict(zip([strategies[idx] for idx in np.nonzero(col_mask)[0]], col_ne_probs[col_mask].tolist()))
+                    print("    Row Player Strategy:", {s: f"{p:.3f}" for s, p in row_ne_dict.items()})
+                    opening_nes_list.append({
+                        "equilibrium_index": i + 1,
+                        "row_strategy": row_ne_dict,
+                        "column_strategy": col_ne_dict # Keep col strategy for completeness
+                    })
+                if ne_count == 0: print(f"  No Nash Equilibria found by {ne_method}.")
+                opening_result = opening_nes_list
+
+            except OverflowError:
+                print(f"Error (Overflow) during {ne_method} for {opening}. Matrix may be too large/complex.")
+                opening_result = {"error": f"OverflowError during {ne_method}"}
+            except Exception as ve_error:
+                print(f"Error during {ne_method} for {opening}: {ve_error}")
+                opening_result = {"error": str(ve_error)}
+
+        except ValueError as nan_error:
+             print(f"Skipping Nashpy analysis for {opening} due to error (likely NaN): {nan_error}")
+             opening_result = {"error": "Skipped due to NaN in payoff matrix"}
+        except Exception as e:
+            print(f"Error during Nashpy analysis for {opening}: {e}")
+            opening_result = {"error": str(e)}
+
+    return opening, opening_result
+
+def _analyze_opening_worker(payload):
+    """Runs analyze_opening in a worker process, capturing its output (and warnings) so it can be printed in order."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        opening, opening_result = analyze_opening(*payload)
+    return opening, opening_result, log.getvalue()
+
 # --- Main Analysis Function ---
-def analyze_tournament_results(csv_file):
+def analyze_tournament_results(csv_file, no_plots=False):
     """
     Analyze tournament results: Overall performance (incl. draws),
     heatmaps, replicator dynamics, Nash equilibria. Saves output.
+    With no_plots, figures are skipped and only the equilibria JSON is written.
     """
-    run_output_dir, heatmaps_dir, dynamics_dir, equilibria_dir = create_output_directory(csv_file)
+    run_output_dir, heatmaps_dir, dynamics_dir, equilibria_dir = create_output_directory(csv_file, no_plots)
 
     print(f"Reading data from {csv_file}...")
     try:
-        df = pd.read_csv(csv_file)
-        # Ensure columns that should be numeric are numeric
-        cols_to_numeric = ['Wins', 'Losses', 'Draws', 'Win %', 'Games Played']
-        for col in cols_to_numeric:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        # Drop rows where essential numeric data couldn't be parsed
-        df.dropna(subset=cols_to_numeric, inplace=True)
+        df = read_tournament_csv(csv_file)
 
     except FileNotFoundError:
         print(f"Error: CSV file not found at '{csv_file}'"); sys.exit(1)
@@ -56,174 +347,94 @@ def analyze_tournament_results(csv_file):
         print(f"Error reading or processing CSV file: {e}"); sys.exit(1)
 
     # --- Basic Data Extraction ---
-    strategies = sorted(df['Strategy'].unique())
-    openings = df['Opening'].unique()
+    strategies = list(df['Strategy'].cat.categories) # Already sorted by read_tournament_csv
+    # Split by opening once (in order of first appearance); reused by the per-opening analysis
+    opening_groups = list(df.groupby('Opening', sort=False, observed=True))
+    openings = [opening for opening, _ in opening_groups]
     print(f"\nFound {len(strategies)} strategies: {', '.join(strategies)}")
     print(f"Found {len(openings)} openings: {', '.join(openings)}")
 
     # --- Overall Strategy Performance (Score / Total Games) ---
     print("\n--- Overall Strategy Performance (Score / Total Games | Win=1, Draw=0.5, Loss=0) ---")
-    strategy_performance_score = {}
-    for strategy in strategies:
-        # Get all records where this strategy participated as 'Strategy'
-        # The CSV is symmetric, so this covers all games played by the strategy.
-        strategy_records_df = df[df['Strategy'] == strategy]
-
-        if strategy_records_df.empty:
-            print(f"Warning: No records found for strategy '{strategy}' as 'Strategy'. Skipping performance calculation.")
-            strategy_performance_score[strategy] = 0.0 # Or handle as appropriate
-            continue
-
-        # Sum relevant columns from these records
-        total_wins = strategy_records_df['Wins'].sum()
-        total_draws = strategy_records_df['Draws'].sum()
-        total_games_played = strategy_records_df['Games Played'].sum()
-
-        # Calculate score: Win=1 point, Draw=0.5 points
-        total_score = total_wins + 0.5 * total_draws
-
-        # Calculate performance percentage
-        performance_percentage = (total_score / total_games_played) * 100 if total_games_played > 0 else 0
-        strategy_performance_score[strategy] = performance_percentage
+    # All records where a strategy participated as 'Strategy'.
+    # The CSV is symmetric, so this covers all games played by the strategy.
+    strategy_cats = df['Strategy'].cat # Categorical since load
+    strategy_codes = strategy_cats.codes.to_numpy()
+    n_strategy_cats = len(strategy_cats.categories)
+    total_wins, total_draws, total_games = (
+        np.bincount(strategy_codes, weights=df[col].to_numpy(dtype=np.float64), minlength=n_strategy_cats)
+        for col in ('Wins', 'Draws', 'Games Played'))
+    # Calculate score: Win=1 point, Draw=0.5 points, as a percentage of games played (0 if none played)
+    total_score = total_wins + 0.5 * total_draws
+    performance = pd.Series(total_score / np.where(total_games > 0, total_games, 1) * 100, index=strategy_cats.categories)
 
     print("\nOverall Performance Score Percentage:")
-    # Sort by the calculated score percentage
-    for strategy, performance in sorted(strategy_performance_score.items(), key=lambda item: item[1], reverse=True):
-        print(f"- {strategy}: {performance:.2f}%")
+    # Sort by the calculated score percentage (stable, so tied strategies keep their sorted-name order)
+    for strategy, score_pct in performance.sort_values(ascending=False, kind='stable').items():
+        print(f"- {strategy}: {score_pct:.2f}%")
 
     # --- Strategy vs Opening Heatmap (Based on Win Rate: Wins / (Wins + Losses)) ---
     # This heatmap remains based on the win rate in decisive games for comparability
-    print("\n--- Generating Strategy vs Opening Heatmap (Based on Win Rate vs All Opponents) ---")
-    strategy_opening_matrix = pd.DataFrame(index=strategies, columns=openings, dtype=float)
-    for strategy in strategies:
-        for opening in openings:
-            strat_wins_df = df[(df['Strategy'] == strategy) & (df['Opening'] == opening)]
-            strat_losses_df = df[(df['Opponent'] == strategy) & (df['Opening'] == opening)]
-            wins = strat_wins_df['Wins'].sum()
-            losses = strat_losses_df['Wins'].sum() # Opponent's wins are strategy's losses
-            decisive_games = wins + losses
-            # Use Win Rate = Wins / (Wins + Losses) for this specific heatmap
-            win_percentage = (wins / decisive_games) * 100 if decisive_games > 0 else 0
-            strategy_opening_matrix.loc[strategy, opening] = win_percentage
-
-    plt.figure(figsize=(max(10, len(openings)*1.5), max(8, len(strategies)*0.6)))
-    sns.heatmap(strategy_opening_matrix, annot=True, fmt=".1f", cmap="viridis", linewidths=.5)
-    plt.xlabel('Openings'); plt.ylabel('Strategies')
-    plt.title('Win Rate % of Strategy within each Opening (Wins / (Wins+Losses))')
-    plt.xticks(rotation=45, ha='right'); plt.yticks(rotation=0)
-    plt.tight_layout()
-    save_path = os.path.join(heatmaps_dir, '0_Strategy_Opening_WinRate_Heatmap.png')
-    plt.savefig(save_path); plt.close()
-    print(f"Saved: {save_path}")
-
-
-    # --- Per Opening Analysis (Using Head-to-Head Win Rate from CSV for Payoffs) ---
+    if not no_plots:
+        _load_plotting()
+        print("\n--- Generating Strategy vs Opening Heatmap (Based on Win Rate vs All Opponents) ---")
+        strategy_wins = df.pivot_table(index='Strategy', columns='Opening', values='Wins', aggfunc='sum', fill_value=0, observed=True)
+        # Opponent's wins are strategy's losses
+        strategy_losses = df.pivot_table(index='Opponent', columns='Opening', values='Wins', aggfunc='sum', fill_value=0, observed=True)
+        strategy_wins = strategy_wins.reindex(index=strategies, columns=openings, fill_value=0)
+        strategy_losses = strategy_losses.reindex(index=strategies, columns=openings, fill_value=0)
+        decisive_games = strategy_wins + strategy_losses
+        # Use Win Rate = Wins / (Wins + Losses) for this specific heatmap
+        # Back to plain float64: the nullable Int64 counts produce a Float64 frame seaborn cannot plot
+        strategy_opening_matrix = ((strategy_wins / decisive_games.where(decisive_games > 0)).fillna(0) * 100).astype(float)
+
+        plt.figure(figsize=(max(10, len(openings)*1.5), max(8, len(strategies)*0.6)))
+        annot = len(strategies) <= MAX_ANNOTATED_STRATEGIES
+        sns.heatmap(strategy_opening_matrix, annot=annot, fmt=".1f", cmap="viridis", linewidths=.5, rasterized=True)
+        plt.xlabel('Openings'); plt.ylabel('Strategies')
+        plt.title('Win Rate % of Strategy within each Opening (Wins / (Wins+Losses))')
+        plt.xticks(rotation=45, ha='right'); plt.yticks(rotation=0)
+        plt.tight_layout()
+        save_path = os.path.join(heatmaps_dir, '0_Strategy_Opening_WinRate_Heatmap.png')
+        plt.savefig(save_path, dpi=HEATMAP_DPI); plt.close()
+        print(f"Saved: {save_path}")
+
+
+    # --- Per Opening Analysis (Using Head-to-Head Win Rate from the Summed Counts for Payoffs) ---
     print("\n--- Per Opening Analysis (Using Head-to-Head Win Rate for Payoffs) ---")
     all_nash_equilibria = {}
     HAS_NASHPY = False
     try:
         import nashpy as nash
-        print("Nashpy found. Performing Replicator Dynamics and Nash Equilibria analysis.")
+        print(f"Nashpy found. Performing {'' if no_plots else 'Replicator Dynamics and '}Nash Equilibria analysis.")
         HAS_NASHPY = True
     except ImportError:
         print("Warning: nashpy module not found. Skipping Nashpy analysis.")
 
-    for k, opening in enumerate(openings):
-        print(f"\n--- Analyzing Opening: {opening} ---")
-        opening_df = df[df['Opening'] == opening].copy()
-
-        # --- 1. Matchup Heatmap (Head-to-Head Win %) ---
-        print(f"Generating Matchup Heatmap for {opening}...")
-        matchup_matrix_pct = pd.DataFrame(index=strategies, columns=strategies, dtype=float)
-        for i, s1 in enumerate(strategies):
-            for j, s2 in enumerate(strategies):
-                if i == j: matchup_matrix_pct.loc[s1, s2] = 50.0
-                else:
-                    matchup = opening_df[(opening_df['Strategy'] == s1) & (opening_df['Opponent'] == s2)]
-                    if not matchup.empty:
-                         # Use the pre-calculated Win % (Wins / (Wins + Losses)) from CSV
-                        matchup_matrix_pct.loc[s1, s2] = matchup['Win %'].iloc[0]
-                    else:
-                        matchup_matrix_pct.loc[s1, s2] = np.nan
-                        print(f"Warning: Missing matchup data for {s1} vs {s2} in {opening}")
-
-        plt.figure(figsize=(max(10, len(strategies)*0.8), max(8, len(strategies)*0.7)))
-        sns.heatmap(matchup_matrix_pct, annot=True, fmt=".1f", cmap="viridis_r",
-                   linewidths=.5, linecolor='lightgray', cbar_kws={'label': f'Win % for Row Player'})
-        plt.xlabel('Opponent Strategy'); plt.ylabel('Strategy'); plt.title(f'Head-to-Head Win % ({opening})')
-        plt.xticks(rotation=45, ha='right'); plt.yticks(rotation=0); plt.tight_layout()
-        heatmap_filename = f'{k+1}_{opening.replace(" ", "_")}_Matchup_Heatmap.png'
-        save_path = os.path.join(heatmaps_dir, heatmap_filename); plt.savefig(save_path); plt.close()
-        print(f"Saved: {save_path}")
-
-        # --- 2. Replicator Dynamics & Nash Equilibria ---
-        if HAS_NASHPY:
-            print(f"Calculating Replicator Dynamics and Nash Equilibria for {opening}...")
-             # Payoff matrix A based on head-to-head win rate (row player's perspective)
-            payoff_matrix_A = matchup_matrix_pct.to_numpy() / 100.0
-
-            if np.isnan(payoff_matrix_A).any():
-                print(f"Skipping Nashpy analysis for {opening} due to missing data (NaN).")
-                all_nash_equilibria[opening] = {"error": "Skipped due to NaN in payoff matrix"}
-                continue
-
+    # Openings are independent, so analyse them in parallel across processes
+    payloads = [(k, opening, opening_df, strategies, heatmaps_dir, dynamics_dir, HAS_NASHPY, no_plots)
+                for k, (opening, opening_df) in enumerate(opening_groups)]
+    max_workers = max(1, min(len(payloads), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_analyze_opening_worker, payload) for payload in payloads]
+        for payload, future in zip(payloads, futures):
             try:
-                game = nash.Game(payoff_matrix_A) # Zero sum game
-
-                # --- 2a. Replicator Dynamics ---
-                # ... (Replicator dynamics plotting code remains the same) ...
-                initial_pop = np.array([1/len(strategies)] * len(strategies))
-                timepoints = np.linspace(0, 50, 20000)
-                populations = game.replicator_dynamics(y0=initial_pop, timepoints=timepoints)
-                pop_df = pd.DataFrame(populations, columns=strategies); pop_df['Generation'] = range(len(populations))
-                pop_long = pop_df.melt(id_vars=['Generation'], value_vars=strategies, var_name='Strategy', value_name='Population Share')
-                plt.figure(figsize=(12, 8)); sns.set_style("whitegrid")
-                palette = sns.color_palette("husl", len(strategies))
-                ax = sns.lineplot(data=pop_long, x='Generation', y='Population Share', hue='Strategy', linewidth=2.5, palette=palette)
-                plt.title(f'Replicator Dynamics ({opening})', fontsize=16)
-                plt.xlabel('Generation', fontsize=14); plt.ylabel('Population Share', fontsize=14); plt.ylim(0, 1.05)
-                plt.legend(title='Strategy', bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.)
-                plt.grid(True, linestyle='--', alpha=0.7); plt.tight_layout(rect=[0, 0, 0.85, 1])
-                rd_filename = f"{k+1}_{opening.replace(' ', '_')}_RD.png"
-                save_path = os.path.join(dynamics_dir, rd_filename); plt.savefig(save_path, dpi=300); plt.close()
-                print(f"Saved: {save_path}")
-
-
-                # --- 2b. Nash Equilibria (Vertex Enumeration) ---
-                print(f"Finding Nash Equilibria for {opening} using Vertex Enumeration...")
-                opening_nes_list = []
+                opening, opening_result, log = future.result()
+            except BrokenProcessPool:
+                # A dead worker (e.g. killed by the OS) breaks the whole pool and fails every opening still
+                # pending, so rerun each of those alone in a fresh process; only the crashing opening is lost
+                opening = payload[1]
                 try:
-                    equilibria_generator = game.vertex_enumeration()
-                    print(f"Nash Equilibria found for {opening}:")
-                    ne_count = 0
-                    for i, eq in enumerate(equilibria_generator):
-                        ne_count += 1
-                        print(f"  NE {i+1}:")
-                        row_ne_probs, col_ne_probs = eq[0], eq[1]
-                        row_ne_dict = {strategies[idx]: prob for idx, prob in enumerate(row_ne_probs) if prob > 1e-4}
-                        col_ne_dict = {strategies[idx]: prob for idx, prob in enumerate(col_ne_probs) if prob > 1e-4}
-                        print("    Row Player Strategy:", {s: f"{p:.3f}" for s, p in row_ne_dict.items()})
-                        opening_nes_list.append({
-                            "equilibrium_index": i + 1,
-                            "row_strategy": row_ne_dict,
-                            "column_strategy": col_ne_dict # Keep col strategy for completeness
-                        })
-                    if ne_count == 0: print("  No Nash Equilibria found by vertex enumeration.")
-                    all_nash_equilibria[opening] = opening_nes_list
-
-                except OverflowError:
-                    print(f"Error (Overflow) during vertex enumeration for {opening}. Matrix may be too large/complex.")
-                    all_nash_equilibria[opening] = {"error": "OverflowError during vertex enumeration"}
-                except Exception as ve_error:
-                    print(f"Error during vertex enumeration for {opening}: {ve_error}")
-                    all_nash_equilibria[opening] = {"error": str(ve_error)}
-
-            except ValueError as nan_error:
-                 print(f"Skipping Nashpy analysis for {opening} due to error (likely NaN): {nan_error}")
-                 all_nash_equilibria[opening] = {"error": "Skipped due to NaN in payoff matrix"}
-            except Exception as e:
-                print(f"Error during Nashpy analysis for {opening}: {e}")
-                all_nash_equilibria[opening] = {"error": str(e)}
+                    with ProcessPoolExecutor(max_workers=1) as retry_executor:
+                        opening, opening_result, log = retry_executor.submit(_analyze_opening_worker, payload).result()
+                except BrokenProcessPool as worker_error:
+                    print(f"\nError: analysis worker for {opening} failed: {worker_error!r}")
+                    if HAS_NASHPY:
+                        all_nash_equilibria[opening] = {"error": f"Worker failed: {worker_error!r}"}
+                    continue
+            print(log, end='')
+            if opening_result is not None:
+                all_nash_equilibria[opening] = opening_result
 
     # --- Save Nash Equilibria to JSON ---
     if HAS_NASHPY and all_nash_equilibria:
@@ -232,21 +443,7 @@ def analyze_tournament_results(csv_file):
         print(f"\n--- Saving Nash Equilibria to JSON ---")
         try:
             with open(ne_save_path, 'w') as f:
-                # Convert numpy types to native Python types for JSON serialization
-                 serializable_nes = {}
-                 for opening, nes in all_nash_equilibria.items():
-                     if isinstance(nes, list):
-                         serializable_nes[opening] = [
-                            {
-                                "equilibrium_index": ne["equilibrium_index"],
-                                "row_strategy": {k: float(v) for k, v in ne["row_strategy"].items()},
-                                "column_strategy": {k: float(v) for k, v in ne["column_strategy"].items()}
-                            } for ne in nes
-                         ]
-                     else: # Handle error dictionaries
-                         serializable_nes[opening] = nes
-
-                 json.dump(serializable_nes, f, indent=4)
+                json.dump(all_nash_equilibria, f, indent=4)
             print(f"Saved: {ne_save_path}")
         except Exception as e:
             print(f"Error saving Nash Equilibria to JSON: {e}")
@@ -262,9 +459,10 @@ def analyze_tournament_results(csv_file):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analyze Quoridor tournament results.")
     parser.add_argument("csv_file", help="Path to the tournament results CSV file.")
+    parser.add_argument("--no-plots", action="store_true", help="Skip all figures; only compute and save the Nash equilibria.")
     args = parser.parse_args()
 
     if not os.path.exists(args.csv_file): print(f"Error: Input CSV file not found at '{args.csv_file}'"); sys.exit(1)
     if not os.path.isfile(args.csv_file): print(f"Error: Provided path '{args.csv_file}' is not a file."); sys.exit(1)
 
-    analyze_tournament_results(args.csv_file)
\ No newline at end of file
+    analyze_tournament_results(args.csv_file, no_plots=args.no_plots)
\ No newline at end of file